@@ -2,9 +2,11 @@ import os
 import shutil
 import tempfile
 import dicom2nifti
-from typing import List, Tuple  
+import dicom2nifti.common
+import dicom2nifti.convert_dicom
+from typing import List, Optional, Tuple  
 from dcmsort2nii.dicom_utils import analyze_dicom_sequences
-from dcmsort2nii.exception import ConversionError, suppress_stdout_stderr
+from dcmsort2nii.exception import ConversionError, suppress_library_logging
 
 def convert_single_folder(dicom_dir: str, output_dir: str) -> List[Tuple[str, str]]:
     """
@@ -35,7 +37,8 @@ def convert_single_folder(dicom_dir: str, output_dir: str) -> List[Tuple[str, st
     return mapping
 
 
-def convert_sequence_to_nifti(dicom_files: list, output_dir: str, sequence_name: str) -> dict:
+def convert_sequence_to_nifti(dicom_files: list, output_dir: str, sequence_name: str,
+                              temp_root: Optional[str] = None) -> dict:
     """
     Convert a sequence of DICOM files to NIfTI format.
     
@@ -43,36 +46,60 @@ def convert_sequence_to_nifti(dicom_files: list, output_dir: str, sequence_name:
         dicom_files (list): List of DICOM file paths
         output_dir (str): Directory to save the NIfTI file
         sequence_name (str): Name to use for the output file
+        temp_root (str, optional): Parent directory for temporary files (default: system temp dir)
         
     Returns:
         dict: Conversion result information
     """
-    try:
-        # Create a temporary directory to organize the DICOM files
-        with tempfile.TemporaryDirectory() as temp_dir:
-            copy_files_to_temp_dir(dicom_files, temp_dir)
-            
-            output_file = os.path.join(output_dir, f"{sequence_name}.nii.gz")
-
-            with tempfile.TemporaryDirectory() as temp_output_dir:  
-                try:
-                    # Suppress stdout/stderr during conversion
-                    with suppress_stdout_stderr():
-                        dicom2nifti.convert_directory(temp_dir, temp_output_dir, compression=True, reorient=True)
-
-                    # Move to the final destination
-                    shutil.move(os.path.join(temp_output_dir, os.listdir(temp_output_dir)[0]), output_file)
-
-                except Exception as e:
-                    raise ConversionError(f"dicom2nifti.convert_directory failed converting {len(dicom_files)} files: {dicom_files[0]}")
-
-            return {
-                'first_dicom_file': dicom_files[0],
-                'output_file': output_file,
-            }
-    
-    except Exception as e:
-        raise e
+    # Create a temporary directory to organize the DICOM files
+    with tempfile.TemporaryDirectory(dir=temp_root) as temp_dir:
+        copy_files_to_temp_dir(dicom_files, temp_dir)
+        return convert_staged_dir_to_nifti(temp_dir, dicom_files, output_dir, sequence_name, temp_root)
+
+def convert_staged_dir_to_nifti(staged_dir: str, dicom_files: list, output_dir: str, sequence_name: str,
+                                temp_root: Optional[str] = None) -> dict:
+    """
+    Convert a directory already populated by copy_files_to_temp_dir to NIfTI format.
+
+    Lets the I/O-bound staging run separately (e.g. on a thread) from the
+    CPU-bound pixel decoding and compression (e.g. in a worker process).
+    Safe to call from multiple threads.
+
+    Args:
+        staged_dir (str): Directory containing only the staged DICOM files of one sequence
+        dicom_files (list): Original DICOM file paths (used for the result and error messages)
+        output_dir (str): Directory to save the NIfTI file
+        sequence_name (str): Name to use for the output file
+        temp_root (str, optional): Parent directory for temporary files (default: system temp dir)
+
+    Returns:
+        dict: Conversion result information, including the in-memory
+        'nifti_image' (nibabel image) so callers can reuse the volume
+    """
+    output_file = os.path.join(output_dir, f"{sequence_name}.nii.gz")
+
+    with tempfile.TemporaryDirectory(dir=temp_root) as temp_output_dir:  
+        try:
+            temp_output_file = os.path.join(temp_output_dir, os.path.basename(output_file))
+
+            # Suppress dicom2nifti logging during conversion. dicom_series_to_nifti would copy
+            # the staged directory again into the system temp dir, so read it directly instead.
+            with suppress_library_logging():
+                dicom_input = dicom2nifti.common.read_dicom_directory(staged_dir)
+                conversion = dicom2nifti.convert_dicom.dicom_array_to_nifti(dicom_input, temp_output_file,
+                                                                            reorient_nifti=True)
+
+            # Move to the final destination
+            shutil.move(temp_output_file, output_file)
+
+        except Exception as e:
+            raise ConversionError(f"dicom2nifti.dicom_array_to_nifti failed converting {len(dicom_files)} files: {dicom_files[0]}")
+
+    return {
+        'first_dicom_file': dicom_files[0],
+        'output_file': output_file,
+        'nifti_image': conversion.get('NII'),
+    }
 
 def copy_files_to_temp_dir(dicom_files: list, temp_dir: str): 
     """
@@ -1,3 +1,6 @@
+import sys
+import logging
+import threading
 from contextlib import contextmanager
 
 class ConversionError(Exception):
@@ -6,9 +9,25 @@ class ConversionError(Exception):
         self.message = message
         super().__init__(self.message)
 
+class TaskTimeoutError(Exception):
+    """Exception raised when a pool task exceeds its timeout and its worker is killed."""
+    def __init__(self, message="Task exceeded its timeout"):
+        self.message = message
+        super().__init__(self.message)
+
+class WorkerCrashedError(Exception):
+    """Exception raised when a pool worker exits while running a task."""
+    def __init__(self, message="Worker process exited unexpectedly"):
+        self.message = message
+        super().__init__(self.message)
+
 @contextmanager
 def suppress_stdout_stderr():
-    """Context manager to suppress stdout and stderr output."""
+    """Context manager to suppress stdout and stderr output.
+
+    Swaps the global sys.stdout/sys.stderr, so it is only safe when no other
+    thread is running; prefer suppress_library_logging inside thread pools.
+    """
     import sys
     from io import StringIO
     
@@ -22,3 +41,86 @@ def suppress_stdout_stderr():
     finally:
         # Restore original stdout/stderr
         sys.stdout, sys.stderr = original_stdout, original_stderr
+
+_capture_state = threading.local()
+_capture_lock = threading.Lock()
+_captured_loggers = set()
+
+class _ThreadCaptureHandler(logging.Handler):
+    """Buffers records from threads inside suppress_library_logging and forwards all others."""
+    def __init__(self, logger_name: str):
+        super().__init__()
+        self.logger_name = logger_name
+
+    def emit(self, record):
+        buffer = getattr(_capture_state, 'buffer', None)
+        if buffer is not None:
+            buffer.append(record)
+            return
+        # Not capturing in this thread: pass on to the ancestors as propagation would
+        parent = logging.getLogger(self.logger_name).parent
+        if parent is not None:
+            parent.handle(record)
+
+def _install_capture_handler(logger_name: str):
+    with _capture_lock:
+        if logger_name in _captured_loggers:
+            return
+        logger = logging.getLogger(logger_name)
+        logger.addHandler(_ThreadCaptureHandler(logger_name))
+        logger.propagate = False
+        _captured_loggers.add(logger_name)
+
+class _ThreadAwareStream:
+    """Proxy for sys.stdout/sys.stderr that drops writes from capturing threads."""
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, text):
+        if getattr(_capture_state, 'buffer', None) is not None:
+            return len(text)
+        return self._stream.write(text)
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def flush(self):
+        if getattr(_capture_state, 'buffer', None) is None:
+            self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+def _install_stream_proxies():
+    # Re-wrap if someone replaced the streams since (e.g. suppress_stdout_stderr)
+    with _capture_lock:
+        if not isinstance(sys.stdout, _ThreadAwareStream):
+            sys.stdout = _ThreadAwareStream(sys.stdout)
+        if not isinstance(sys.stderr, _ThreadAwareStream):
+            sys.stderr = _ThreadAwareStream(sys.stderr)
+
+@contextmanager
+def suppress_library_logging(logger_names=('dicom2nifti', 'pydicom')):
+    """Thread-safe context manager to silence library output in the current thread.
+
+    A handler installed once on each named logger buffers records emitted by
+    threads inside this context and forwards records from all other threads.
+    sys.stdout/sys.stderr are wrapped once in proxies that discard writes from
+    capturing threads (e.g. dicom2nifti's traceback.print_exc()) and pass all
+    other writes through. Python warnings are not captured.
+
+    Yields:
+        list: logging.LogRecord objects captured in this thread
+    """
+    for name in logger_names:
+        _install_capture_handler(name)
+    _install_stream_proxies()
+
+    previous = getattr(_capture_state, 'buffer', None)
+    buffer = []
+    _capture_state.buffer = buffer
+    try:
+        yield buffer
+    finally:
+        _capture_state.buffer = previous
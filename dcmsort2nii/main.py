@@ -16,11 +16,30 @@ def main():
                        help='Explicitly disable splitting 4D NIfTI files')
     parser.add_argument('--log_debug', action='store_true',
                        help='Enable detailed debug logging to console')
+    parser.add_argument('--preview', type=str, choices=['png', 'npy'], default=None,
+                       help='Write an orthogonal mid-slice preview next to each NIfTI file')
+    parser.add_argument('--partition_by', type=str, default=None,
+                       help='Write the mapping as a dataset partitioned by this mapping column (e.g. "Study Date", "Patient ID")')
+    parser.add_argument('--mapping_mode', type=str, choices=['overwrite', 'append', 'upsert'], default='overwrite',
+                       help='How to merge this run into an existing partitioned mapping (requires --partition_by)')
     parser.add_argument('--threads', type=int, default=0,
                        help='Number of worker processes (default: all available)')
+    parser.add_argument('--executor', type=str, choices=['process', 'thread', 'hybrid'], default='process',
+                       help='Run sequences in processes, threads, or I/O threads feeding conversion processes (hybrid)')
+    parser.add_argument('--io_threads', type=int, default=0,
+                       help='Number of I/O threads for thread/hybrid scan and hybrid staging (default: 2 x workers)')
+    parser.add_argument('--timeout', type=float, default=0,
+                       help='Kill and replace a worker after this many seconds on one sequence (default: no timeout)')
+    parser.add_argument('--max_tasks_per_worker', type=int, default=0,
+                       help='Replace each worker process after this many sequences (default: never)')
 
     args = parser.parse_args()
 
+    if args.mapping_mode != 'overwrite' and not args.partition_by:
+        parser.error('--mapping_mode append/upsert requires --partition_by')
+    if args.executor == 'thread' and (args.timeout > 0 or args.max_tasks_per_worker > 0):
+        parser.error('--timeout and --max_tasks_per_worker require --executor process or hybrid')
+
     if not args.dicom_root_dir:
         args.dicom_root_dir = input('Enter DICOM root directory: ')
     if not args.output_root_dir:
@@ -36,7 +55,14 @@ def main():
                      args.threads,
                      args.log_error,
                      args.split,
-                     args.log_debug)
+                     args.log_debug,
+                     args.preview,
+                     args.partition_by,
+                     args.mapping_mode,
+                     args.executor,
+                     args.io_threads or None,
+                     args.timeout if args.timeout > 0 else None,
+                     args.max_tasks_per_worker or None)
 
 if __name__ == "__main__":
     main()
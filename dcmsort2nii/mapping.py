@@ -0,0 +1,208 @@
+import os
+import uuid
+import urllib.parse
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from typing import List, Optional, Union
+
+MAPPING_KEY = 'NiftiFile'
+WRITE_MODES = ('overwrite', 'append', 'upsert')
+# Column names follow extract_all_metadata, which uses pydicom's element names
+DEFAULT_SORT_BY = ['Patient ID', 'Series Instance UID', 'NiftiFile']
+
+_filters_to_expression = getattr(pq, 'filters_to_expression', None) or getattr(pq, '_filters_to_expression', None)
+
+def _partitioning(partition_by: str) -> ds.Partitioning:
+    # Partition values are always strings so that e.g. 'Study Date' keeps its leading digits
+    return ds.partitioning(pa.schema([(partition_by, pa.string())]), flavor='hive')
+
+def _partition_value(value) -> Optional[str]:
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    return str(value)
+
+def detect_partition_column(dataset_dir: str) -> Optional[str]:
+    """Return the hive partition column of a mapping dataset, or None if unpartitioned."""
+    if not os.path.isdir(dataset_dir):
+        return None
+    for entry in sorted(os.listdir(dataset_dir)):
+        if '=' in entry and os.path.isdir(os.path.join(dataset_dir, entry)):
+            return urllib.parse.unquote(entry.split('=', 1)[0])
+    return None
+
+def open_mapping_dataset(dataset_dir: str, partition_by: Optional[str] = None) -> ds.Dataset:
+    """
+    Open a partitioned mapping dataset with a schema unified across all files.
+
+    Separate runs contribute different sparse tag columns, so the schema of the
+    first file alone is not enough; the footers of all files are merged.
+
+    Args:
+        dataset_dir (str): Dataset root directory
+        partition_by (str, optional): Partition column, detected from the layout if omitted
+
+    Returns:
+        ds.Dataset: pyarrow dataset
+    """
+    partition_by = partition_by or detect_partition_column(dataset_dir)
+    partitioning = _partitioning(partition_by) if partition_by else None
+    dataset = ds.dataset(dataset_dir, format='parquet', partitioning=partitioning)
+
+    schemas = [fragment.physical_schema for fragment in dataset.get_fragments()]
+    if partition_by:
+        schemas.append(pa.schema([(partition_by, pa.string())]))
+    if len(schemas) > 1:
+        dataset = ds.dataset(dataset_dir, schema=pa.unify_schemas(schemas),
+                             format='parquet', partitioning=partitioning)
+    return dataset
+
+def _to_table(df: pd.DataFrame, partition_by: str, existing_schema: Optional[pa.Schema]) -> pa.Table:
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.set_column(table.schema.get_field_index(partition_by), partition_by,
+                             table.column(partition_by).cast(pa.string()))
+
+    # Keep column types compatible with files already in the dataset. A column
+    # that cannot be cast would make the whole dataset unreadable, so refuse to write.
+    if existing_schema is not None:
+        conflicts = []
+        for i, field in enumerate(table.schema):
+            if field.name not in existing_schema.names:
+                continue
+            target = existing_schema.field(field.name).type
+            if field.type == target or pa.types.is_null(target) or pa.types.is_null(field.type):
+                continue
+            try:
+                table = table.set_column(i, field.name, table.column(i).cast(target))
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError):
+                conflicts.append(f"{field.name} ({field.type} vs existing {target})")
+        if conflicts:
+            raise ValueError(f"Mapping columns have types incompatible with the existing dataset: {', '.join(conflicts)}")
+    return table
+
+def _remove_files(paths: List[str]):
+    for path in paths:
+        os.remove(path)
+        # Drop partition directories that became empty
+        parent = os.path.dirname(path)
+        try:
+            os.rmdir(parent)
+        except OSError:
+            pass
+
+def write_mapping_dataset(df: pd.DataFrame,
+                          dataset_dir: str,
+                          partition_by: str = 'Study Date',
+                          mode: str = 'overwrite',
+                          sort_by: Optional[List[str]] = None,
+                          max_rows_per_group: int = 64 * 1024) -> str:
+    """
+    Write a mapping DataFrame as a hive-partitioned Parquet dataset.
+
+    Rows are sorted by the partition column and sort_by columns before writing,
+    so row group statistics allow predicate pushdown on those columns.
+
+    Modes:
+        'overwrite': replace all files of the dataset
+        'append': add the rows as new files next to the existing ones
+        'upsert': replace existing rows with the same NiftiFile, add the rest
+
+    New files are written before old ones are removed, so an interrupted
+    overwrite/upsert leaves duplicates rather than losing rows. In append and
+    upsert mode a ValueError is raised, and nothing is written, if a column
+    cannot be cast to its type in the existing dataset.
+
+    Args:
+        df (pd.DataFrame): Mapping with one row per NIfTI file
+        dataset_dir (str): Dataset root directory
+        partition_by (str): Column to partition on (e.g. 'Study Date' or 'Patient ID')
+        mode (str): One of 'overwrite', 'append', 'upsert'
+        sort_by (List[str], optional): Sort columns within partitions
+        max_rows_per_group (int): Maximum rows per Parquet row group
+
+    Returns:
+        str: dataset_dir
+    """
+    if mode not in WRITE_MODES:
+        raise ValueError(f"Unsupported mapping write mode '{mode}', expected one of {WRITE_MODES}")
+
+    if partition_by not in df.columns:
+        raise ValueError(f"Partition column '{partition_by}' is not a mapping column")
+
+    df = df.copy()
+    df[partition_by] = df[partition_by].map(_partition_value)
+
+    existing = None
+    files_to_remove = []
+    if os.path.isdir(dataset_dir):
+        if mode == 'overwrite':
+            # Old files are only removed, so their schema and layout do not matter
+            files_to_remove = list(ds.dataset(dataset_dir, format='parquet').files)
+        else:
+            existing_partition = detect_partition_column(dataset_dir)
+            if existing_partition and existing_partition != partition_by:
+                raise ValueError(f"Dataset {dataset_dir} is partitioned by '{existing_partition}', not '{partition_by}'")
+            existing = open_mapping_dataset(dataset_dir, partition_by)
+            if not existing.files:
+                existing = None
+
+    if existing is not None and mode == 'upsert' and MAPPING_KEY in df.columns:
+        keys = pa.array(df[MAPPING_KEY].dropna().astype(str).unique(), type=pa.string())
+        moved = existing.to_table(columns=[partition_by], filter=ds.field(MAPPING_KEY).isin(keys))
+        affected = set(df[partition_by]) | set(moved.column(partition_by).to_pylist())
+
+        values = pa.array([v for v in affected if v is not None], type=pa.string())
+        condition = ds.field(partition_by).isin(values)
+        if None in affected:
+            condition = condition | ds.field(partition_by).is_null()
+
+        kept = existing.to_table(filter=condition & ~ds.field(MAPPING_KEY).isin(keys)).to_pandas()
+        df = pd.concat([kept, df], ignore_index=True)
+
+        for fragment in existing.get_fragments(filter=condition):
+            files_to_remove.append(fragment.path)
+
+    sort_columns = [partition_by] + [c for c in (sort_by or DEFAULT_SORT_BY) if c in df.columns and c != partition_by]
+    df = df.sort_values(sort_columns, na_position='last', kind='stable').reset_index(drop=True)
+
+    table = _to_table(df, partition_by, existing.schema if existing is not None else None)
+    ds.write_dataset(table, dataset_dir,
+                     format='parquet',
+                     partitioning=_partitioning(partition_by),
+                     basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+                     existing_data_behavior='overwrite_or_ignore',
+                     file_options=ds.ParquetFileFormat().make_write_options(write_statistics=True),
+                     max_rows_per_group=max_rows_per_group,
+                     use_threads=False)  # keep the sorted row order within each file
+
+    _remove_files(files_to_remove)
+    return dataset_dir
+
+def query_mapping(dataset_dir: str,
+                  filters: Union[ds.Expression, list, None] = None,
+                  columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Read rows of a mapping dataset, pushing filters down to partitions and row groups.
+
+    Example:
+        query_mapping(path, [('Patient ID', '==', 'P001')])
+        query_mapping(path, [('Study Date', '>=', '20200101'), ('Study Date', '<=', '20201231')],
+                      columns=['NiftiFile', 'Series Description'])
+
+    Args:
+        dataset_dir (str): Dataset root directory
+        filters: pyarrow expression or pyarrow.parquet-style filter list (DNF);
+            filter lists need a pyarrow version that provides filters_to_expression
+        columns (List[str], optional): Columns to read
+
+    Returns:
+        pd.DataFrame: Matching rows
+    """
+    dataset = open_mapping_dataset(dataset_dir)
+    if filters is not None and not isinstance(filters, ds.Expression):
+        if _filters_to_expression is None:
+            raise ImportError(f"Filter lists require a newer pyarrow (installed: {pa.__version__}); "
+                              "pass a pyarrow.dataset expression such as ds.field('Patient ID') == 'P001' instead")
+        filters = _filters_to_expression(filters)
+    return dataset.to_table(columns=columns, filter=filters).to_pandas()
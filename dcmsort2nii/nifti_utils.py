@@ -1,14 +1,17 @@
 import os
 import numpy as np
 import nibabel as nib   
-from typing import List, Tuple  
+from typing import Callable, List, Optional, Tuple  
 
-def split_4d_to_3d(dcm_file: str, nifti_file: str) -> List[Tuple[str, str]]:
+def split_4d_to_3d(dcm_file: str, nifti_file: str,
+                   volume_callback: Optional[Callable[[np.ndarray, str], None]] = None) -> List[Tuple[str, str]]:
     """Split 4D NIfTI, return [(dcm_file, nifti_file[i] ) for i in range(nifti_file.shape[3])]
     
     Args:
         dcm_file (str): Path to the DICOM files[0]
         nifti_file (str): Path to the NIfTI file
+        volume_callback (callable, optional): Called as callback(data, nifti_file) for every
+            resulting 3D volume while its data is still in memory (e.g. to write previews)
         
     Returns:
         List[Tuple[str, str]]: List of tuples of DICOM file and NIfTI file
@@ -19,6 +22,8 @@ def split_4d_to_3d(dcm_file: str, nifti_file: str) -> List[Tuple[str, str]]:
         data = np.asanyarray(img.dataobj)
         
         if len(data.shape) == 3:
+            if volume_callback is not None:
+                volume_callback(data, nifti_file)
             return [(dcm_file, nifti_file)]
         
         elif len(data.shape) == 4:
@@ -32,6 +37,8 @@ def split_4d_to_3d(dcm_file: str, nifti_file: str) -> List[Tuple[str, str]]:
                 img_3d = nib.Nifti1Image(vol_data, img.affine, img.header)
                 new_file = os.path.join(output_dir, f'{base_name}_vol_{i:04d}.nii.gz')
                 nib.save(img_3d, new_file)
+                if volume_callback is not None:
+                    volume_callback(vol_data, new_file)
                 output_files.append(new_file)
             
             os.remove(nifti_file)
@@ -1,4 +1,5 @@
 import os
+import contextlib
 import uuid
 import shutil
 import tempfile
@@ -6,75 +7,130 @@ import pandas as pd
 import concurrent.futures
 import pyarrow.parquet as pq
 from tqdm import tqdm
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from dcmsort2nii.nifti_utils import split_4d_to_3d
-from dcmsort2nii.conversion import convert_sequence_to_nifti
+from dcmsort2nii.mapping import write_mapping_dataset, WRITE_MODES
+from dcmsort2nii.preview import save_preview, save_preview_from_file
+from dcmsort2nii.conversion import convert_sequence_to_nifti, convert_staged_dir_to_nifti, copy_files_to_temp_dir
 from dcmsort2nii.dicom_utils import extract_all_metadata, analyze_dicom_sequences
+from dcmsort2nii.exception import TaskTimeoutError
+from dcmsort2nii.workers import RecyclingProcessPool
 
-def process_sequence_and_save(
+EXECUTOR_MODES = ('process', 'thread', 'hybrid')
+
+def convert_and_split(
     dicom_files: List[str],
     output_dir: str,
     sequence_name: str,
-    temp_results_dir: str,
     split: bool,
-    log_debug: bool
+    log_debug: bool,
+    preview: Optional[str] = None,
+    staged_dir: Optional[str] = None,
+    scratch_dir: Optional[str] = None
 ) -> Dict[str, Any]:
     """
-    Converts a single DICOM sequence, optionally splits, extracts metadata,
-    and saves the result(s) to a temporary Parquet file.
+    CPU-bound part of a sequence task: converts a single DICOM sequence (from
+    staged_dir if its files were already staged), optionally splits 4D outputs
+    and optionally writes mid-slice previews.
 
-    Returns a dictionary containing 'results' (list of dicts) and 'errors' (list of dicts).
-    """
-    if not dicom_files:
-        return {'results': [], 'errors': [{'SequenceName': sequence_name, 'Step': 'Input', 'Error': 'No DICOM files provided'}]}
+    Conversion errors are raised; split and preview errors are returned.
+    Temporary directories are created under scratch_dir if given.
 
+    Returns a dictionary containing 'nifti_files' (list), 'previews' (dict of
+    NIfTI file to preview file) and 'errors' (list of dicts).
+    """
     first_dicom_file_for_meta = dicom_files[0]
-    task_results = []
     task_errors = []
+    preview_files = {}
+    preview_attempted = set()
 
-    if log_debug: print(f"DEBUG: Starting sequence {sequence_name} ({len(dicom_files)} files)")
+    def write_preview(data, nifti_file):
+        # Called while the volume is still in memory; never fails the split
+        preview_attempted.add(nifti_file)
+        try:
+            preview_files[nifti_file] = save_preview(data, nifti_file, preview)
+        except Exception as e:
+            task_errors.append({'SequenceName': sequence_name, 'NiftiFile': nifti_file, 'Step': 'Preview', 'Error': str(e)})
+            if log_debug: print(f"DEBUG: Error writing preview for {nifti_file}: {e}")
 
-    try:
-        # 1. Convert Sequence to NIfTI
-        if log_debug: print(f"DEBUG: Converting sequence {sequence_name}")
-        conversion_result = convert_sequence_to_nifti(dicom_files, output_dir, sequence_name)
-        nifti_file_initial = conversion_result['output_file']
-        if log_debug: print(f"DEBUG: Converted {sequence_name} to {nifti_file_initial}")
-
-        # 2. Handle potential 4D splits
-        processed_nifti_files = []
-        if split:
-            try:
-                if log_debug: print(f"DEBUG: Attempting to split {nifti_file_initial}")
-                split_mappings = split_4d_to_3d(first_dicom_file_for_meta, nifti_file_initial)
-                processed_nifti_files = [mapping[1] for mapping in split_mappings]
-                if log_debug: print(f"DEBUG: Split {nifti_file_initial} into {len(processed_nifti_files)} files")
-            except Exception as e:
-                task_errors.append({'SequenceName': sequence_name, 'NiftiFile': nifti_file_initial, 'Step': 'Split', 'Error': str(e)})
-                if log_debug: print(f"DEBUG: Error during split for {nifti_file_initial}: {e}")
-        else:
-            processed_nifti_files = [nifti_file_initial]
+    # 1. Convert Sequence to NIfTI
+    if log_debug: print(f"DEBUG: Converting sequence {sequence_name}")
+    if staged_dir:
+        conversion_result = convert_staged_dir_to_nifti(staged_dir, dicom_files, output_dir, sequence_name,
+                                                        temp_root=scratch_dir)
+    else:
+        conversion_result = convert_sequence_to_nifti(dicom_files, output_dir, sequence_name,
+                                                      temp_root=scratch_dir)
+    nifti_file_initial = conversion_result['output_file']
+    nifti_image = conversion_result.pop('nifti_image', None)
+    if log_debug: print(f"DEBUG: Converted {sequence_name} to {nifti_file_initial}")
 
-        if log_debug: print(f"DEBUG: NIfTI files to process metadata for {sequence_name}: {processed_nifti_files}")
+    # 2. Handle potential 4D splits
+    processed_nifti_files = []
+    if split:
+        nifti_image = None  # split reloads the file; avoid holding two copies
+        try:
+            if log_debug: print(f"DEBUG: Attempting to split {nifti_file_initial}")
+            split_mappings = split_4d_to_3d(first_dicom_file_for_meta, nifti_file_initial,
+                                            volume_callback=write_preview if preview else None)
+            processed_nifti_files = [mapping[1] for mapping in split_mappings]
+            if log_debug: print(f"DEBUG: Split {nifti_file_initial} into {len(processed_nifti_files)} files")
+        except Exception as e:
+            task_errors.append({'SequenceName': sequence_name, 'NiftiFile': nifti_file_initial, 'Step': 'Split', 'Error': str(e)})
+            if log_debug: print(f"DEBUG: Error during split for {nifti_file_initial}: {e}")
+    else:
+        processed_nifti_files = [nifti_file_initial]
+        if preview and nifti_image is not None:
+            write_preview(nifti_image.dataobj, nifti_file_initial)
 
-        # 3. Extract Metadata for each resulting NIfTI file
+    # 2b. Fall back to reading the file only if no in-memory volume was available
+    if preview:
         for nifti_file in processed_nifti_files:
-            try:
-                if log_debug: print(f"DEBUG: Extracting metadata for {nifti_file} using {first_dicom_file_for_meta}")
-                metadata = extract_all_metadata(first_dicom_file_for_meta)
-                result_row = {
-                    'FirstDicomFile': first_dicom_file_for_meta,
-                    'NiftiFile': nifti_file,
-                    **metadata
-                }
-                task_results.append(result_row)
-            except Exception as e:
-                task_errors.append({'SequenceName': sequence_name, 'FirstDicomFile': first_dicom_file_for_meta, 'NiftiFile': nifti_file, 'Step': 'Metadata', 'Error': str(e)})
-                if log_debug: print(f"DEBUG: Error during metadata extraction for {first_dicom_file_for_meta} -> {nifti_file}: {e}")
+            if nifti_file not in preview_attempted:
+                try:
+                    preview_files[nifti_file] = save_preview_from_file(nifti_file, preview)
+                except Exception as e:
+                    task_errors.append({'SequenceName': sequence_name, 'NiftiFile': nifti_file, 'Step': 'Preview', 'Error': str(e)})
+                    if log_debug: print(f"DEBUG: Error writing preview for {nifti_file}: {e}")
 
-    except Exception as e:
-        task_errors.append({'SequenceName': sequence_name, 'FirstDicomFile': first_dicom_file_for_meta, 'Step': 'Conversion/Processing', 'Error': str(e)})
-        if log_debug: print(f"DEBUG: Top-level error processing sequence {sequence_name}: {e}")
+    return {'nifti_files': processed_nifti_files, 'previews': preview_files, 'errors': task_errors}
+
+def extract_and_save(
+    first_dicom_file: str,
+    nifti_files: List[str],
+    preview_files: Dict[str, str],
+    sequence_name: str,
+    temp_results_dir: str,
+    log_debug: bool,
+    preview: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    I/O-bound part of a sequence task: extracts metadata for each NIfTI file
+    and saves the rows to a temporary Parquet file.
+
+    Returns a dictionary containing 'results' (list of dicts) and 'errors' (list of dicts).
+    """
+    task_results = []
+    task_errors = []
+
+    if log_debug: print(f"DEBUG: NIfTI files to process metadata for {sequence_name}: {nifti_files}")
+
+    # 3. Extract Metadata for each resulting NIfTI file
+    for nifti_file in nifti_files:
+        try:
+            if log_debug: print(f"DEBUG: Extracting metadata for {nifti_file} using {first_dicom_file}")
+            metadata = extract_all_metadata(first_dicom_file)
+            result_row = {
+                'FirstDicomFile': first_dicom_file,
+                'NiftiFile': nifti_file,
+                **metadata
+            }
+            if preview:
+                result_row['PreviewFile'] = preview_files.get(nifti_file)
+            task_results.append(result_row)
+        except Exception as e:
+            task_errors.append({'SequenceName': sequence_name, 'FirstDicomFile': first_dicom_file, 'NiftiFile': nifti_file, 'Step': 'Metadata', 'Error': str(e)})
+            if log_debug: print(f"DEBUG: Error during metadata extraction for {first_dicom_file} -> {nifti_file}: {e}")
 
     # 4. Save results for this sequence to a temporary Parquet file
     if task_results:
@@ -90,17 +146,151 @@ def process_sequence_and_save(
     else:
         if log_debug: print(f"DEBUG: No results generated for sequence {sequence_name} to save.")
 
+    return {'results': task_results, 'errors': task_errors}
+
+def process_sequence_and_save(
+    dicom_files: List[str],
+    output_dir: str,
+    sequence_name: str,
+    temp_results_dir: str,
+    split: bool,
+    log_debug: bool,
+    preview: Optional[str] = None,
+    cpu_executor: Optional[concurrent.futures.Executor] = None,
+    scratch_dir: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Converts a single DICOM sequence, optionally splits, optionally writes
+    mid-slice previews ('png' or 'npy'), extracts metadata, and saves the
+    result(s) to a temporary Parquet file.
+
+    If cpu_executor is given (hybrid mode, called on an I/O thread), the files
+    are staged on the calling thread and only convert_and_split is submitted
+    to cpu_executor; metadata extraction and the Parquet write stay on the thread.
+
+    Temporary staging and conversion directories are created under scratch_dir
+    (default: the system temp dir), a directory owned by this task that is removed
+    when it finishes; the caller removes it if a killed worker could not.
+
+    Returns a dictionary containing 'results' (list of dicts) and 'errors' (list of dicts).
+    """
+    if not dicom_files:
+        return {'results': [], 'errors': [{'SequenceName': sequence_name, 'Step': 'Input', 'Error': 'No DICOM files provided'}]}
+
+    first_dicom_file_for_meta = dicom_files[0]
+    task_errors = []
+    converted = {'nifti_files': [], 'previews': {}, 'errors': []}
+
+    if log_debug: print(f"DEBUG: Starting sequence {sequence_name} ({len(dicom_files)} files)")
+    if scratch_dir:
+        os.makedirs(scratch_dir, exist_ok=True)
+
+    try:
+        if cpu_executor is None:
+            converted = convert_and_split(dicom_files, output_dir, sequence_name, split, log_debug, preview,
+                                          scratch_dir=scratch_dir)
+        else:
+            with tempfile.TemporaryDirectory(dir=scratch_dir) as staged_dir:
+                if log_debug: print(f"DEBUG: Staging {len(dicom_files)} files for {sequence_name}")
+                copy_files_to_temp_dir(dicom_files, staged_dir)
+                converted = cpu_executor.submit(convert_and_split, dicom_files, output_dir, sequence_name,
+                                                split, log_debug, preview, staged_dir, scratch_dir).result()
+        task_errors.extend(converted['errors'])
+    except TaskTimeoutError as e:
+        task_errors.append({'SequenceName': sequence_name, 'FirstDicomFile': first_dicom_file_for_meta, 'Step': 'Timeout', 'Error': str(e)})
+        if log_debug: print(f"DEBUG: Timeout processing sequence {sequence_name}: {e}")
+    except Exception as e:
+        task_errors.append({'SequenceName': sequence_name, 'FirstDicomFile': first_dicom_file_for_meta, 'Step': 'Conversion/Processing', 'Error': str(e)})
+        if log_debug: print(f"DEBUG: Top-level error processing sequence {sequence_name}: {e}")
+    finally:
+        if scratch_dir:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    saved = extract_and_save(first_dicom_file_for_meta, converted['nifti_files'], converted['previews'],
+                             sequence_name, temp_results_dir, log_debug, preview)
+    task_results = saved['results']
+    task_errors.extend(saved['errors'])
+
     if log_debug: print(f"DEBUG: Finished processing sequence {sequence_name}. Results: {len(task_results)}, Errors: {len(task_errors)}")
 
     return {'results': task_results, 'errors': task_errors}
 
+def _analyze_leaf_dir(dirpath: str, log_debug: bool):
+    """Analyze one leaf directory, returning (analysis_result, error)."""
+    if log_debug: print(f"DEBUG: Analyzing sequences in: {dirpath}")
+    try:
+        return analyze_dicom_sequences(dirpath), None
+    except Exception as e:
+        return None, e
+
+def _make_process_pool(num_workers: int,
+                       task_timeout: Optional[float] = None,
+                       max_tasks_per_worker: Optional[int] = None) -> concurrent.futures.Executor:
+    """Use a RecyclingProcessPool when timeouts or worker recycling are requested."""
+    if task_timeout or max_tasks_per_worker:
+        return RecyclingProcessPool(num_workers, task_timeout=task_timeout,
+                                    max_tasks_per_worker=max_tasks_per_worker)
+    return concurrent.futures.ProcessPoolExecutor(max_workers=num_workers)
+
+def _make_executors(executor: str, num_workers: int, io_workers: int,
+                    task_timeout: Optional[float] = None,
+                    max_tasks_per_worker: Optional[int] = None):
+    """
+    Create the executors for a run, returning (sequence_executor, cpu_executor).
+
+    'process': every sequence task runs in a worker process.
+    'thread': every sequence task runs on a thread.
+    'hybrid': sequence tasks run on I/O threads and submit conversion to worker processes.
+    """
+    if executor == 'process':
+        return _make_process_pool(num_workers, task_timeout, max_tasks_per_worker), None
+    if executor == 'thread':
+        return concurrent.futures.ThreadPoolExecutor(max_workers=num_workers), None
+    return (concurrent.futures.ThreadPoolExecutor(max_workers=io_workers),
+            _make_process_pool(num_workers, task_timeout, max_tasks_per_worker))
+
 def process_root_dir(dicom_root_dir: str,
                         output_root_dir: str,
                         num_workers: int = 32,
                         error_log: bool = False,
                         split: bool = True,
-                        log_debug: bool = False):
-    """Process directory, analyzing sequences first, then processing each sequence in parallel."""
+                        log_debug: bool = False,
+                        preview: Optional[str] = None,
+                        partition_by: Optional[str] = None,
+                        mapping_mode: str = 'overwrite',
+                        executor: str = 'process',
+                        io_workers: Optional[int] = None,
+                        task_timeout: Optional[float] = None,
+                        max_tasks_per_worker: Optional[int] = None):
+    """Process directory, analyzing sequences first, then processing each sequence in parallel.
+
+    If preview is 'png' or 'npy', an orthogonal mid-slice preview is written next to
+    every output and its path is recorded in the 'PreviewFile' mapping column.
+
+    If partition_by is set (e.g. 'Study Date'), the mapping is written as a partitioned
+    dataset directory 'nifti_dicom_mapping/' instead of a single Parquet file, and
+    mapping_mode ('overwrite', 'append' or 'upsert') controls how this run is merged
+    into an existing dataset.
+
+    executor selects how sequences run: 'process' (one worker process per task),
+    'thread' (threads only), or 'hybrid' (scan, staging, metadata and Parquet
+    writes on io_workers threads, conversion/split/preview on num_workers
+    processes). io_workers defaults to 2 * num_workers.
+
+    task_timeout (seconds) kills and replaces the worker process of a sequence that
+    runs too long and logs a 'Timeout' error row; in hybrid mode it applies to the
+    conversion part only. max_tasks_per_worker replaces each worker process after
+    that many sequences to keep memory bounded. Neither applies to 'thread' mode."""
+
+    if mapping_mode not in WRITE_MODES:
+        raise ValueError(f"Unsupported mapping_mode '{mapping_mode}', expected one of {WRITE_MODES}")
+    if mapping_mode != 'overwrite' and not partition_by:
+        raise ValueError(f"mapping_mode '{mapping_mode}' requires partition_by to be set")
+    if executor not in EXECUTOR_MODES:
+        raise ValueError(f"Unsupported executor '{executor}', expected one of {EXECUTOR_MODES}")
+    if executor == 'thread' and (task_timeout or max_tasks_per_worker):
+        raise ValueError("task_timeout and max_tasks_per_worker require the 'process' or 'hybrid' executor")
+    io_workers = io_workers or 2 * num_workers
 
     error_list = []
 
@@ -109,37 +299,41 @@ def process_root_dir(dicom_root_dir: str,
     dicom_dirs_found = 0
     total_sequences_found = 0
 
-    for dirpath, dirnames, _ in os.walk(dicom_root_dir):
-        if not dirnames:
+    # Directory analysis is I/O-bound, so it runs on threads unless in plain process mode
+    leaf_dirs = [dirpath for dirpath, dirnames, _ in os.walk(dicom_root_dir) if not dirnames]
+    scan_workers = 1 if executor == 'process' else io_workers
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=scan_workers) as scan_executor:
+        analyses = scan_executor.map(lambda dirpath: _analyze_leaf_dir(dirpath, log_debug), leaf_dirs)
+
+        for dirpath, (analysis_result, analysis_error) in zip(leaf_dirs, analyses):
             dicom_dirs_found += 1
-            if log_debug: print(f"DEBUG: Analyzing sequences in: {dirpath}")
-            try:
-                analysis_result = analyze_dicom_sequences(dirpath)
-                num_seq_in_dir = len(analysis_result['sequences'])
-                total_sequences_found += num_seq_in_dir
-                if log_debug: print(f"DEBUG: Found {num_seq_in_dir} sequences in {dirpath}")
-
-                if num_seq_in_dir > 0:
-                    relative_path = os.path.relpath(dirpath, dicom_root_dir)
-                    current_output_dir = os.path.join(output_root_dir, relative_path)
-                    os.makedirs(current_output_dir, exist_ok=True)
-
-                    for seq_key, dicom_files in analysis_result['sequences'].items():
-                        if seq_key in analysis_result['sequence_names']:
-                            seq_name = analysis_result['sequence_names'][seq_key]
-                            task_info = {
-                                'dicom_files': dicom_files,
-                                'output_dir': current_output_dir,
-                                'sequence_name': seq_name,
-                            }
-                            sequence_tasks.append(task_info)
-                        else:
-                            error_list.append({'DicomDir': dirpath, 'SequenceKey': seq_key, 'Step': 'ScanPhase', 'Error': 'Sequence key found but name missing in analysis result.'})
-                            if log_debug: print(f"DEBUG: ERROR - Missing sequence name for key {seq_key} in {dirpath}")
-
-            except Exception as e:
-                error_list.append({'DicomDir': dirpath, 'Step': 'AnalyzeSequences', 'Error': str(e)})
-                print(f"ERROR: Failed to analyze sequences in {dirpath}: {e}")
+            if analysis_error is not None:
+                error_list.append({'DicomDir': dirpath, 'Step': 'AnalyzeSequences', 'Error': str(analysis_error)})
+                print(f"ERROR: Failed to analyze sequences in {dirpath}: {analysis_error}")
+                continue
+
+            num_seq_in_dir = len(analysis_result['sequences'])
+            total_sequences_found += num_seq_in_dir
+            if log_debug: print(f"DEBUG: Found {num_seq_in_dir} sequences in {dirpath}")
+
+            if num_seq_in_dir > 0:
+                relative_path = os.path.relpath(dirpath, dicom_root_dir)
+                current_output_dir = os.path.join(output_root_dir, relative_path)
+                os.makedirs(current_output_dir, exist_ok=True)
+
+                for seq_key, dicom_files in analysis_result['sequences'].items():
+                    if seq_key in analysis_result['sequence_names']:
+                        seq_name = analysis_result['sequence_names'][seq_key]
+                        task_info = {
+                            'dicom_files': dicom_files,
+                            'output_dir': current_output_dir,
+                            'sequence_name': seq_name,
+                        }
+                        sequence_tasks.append(task_info)
+                    else:
+                        error_list.append({'DicomDir': dirpath, 'SequenceKey': seq_key, 'Step': 'ScanPhase', 'Error': 'Sequence key found but name missing in analysis result.'})
+                        if log_debug: print(f"DEBUG: ERROR - Missing sequence name for key {seq_key} in {dirpath}")
 
     print(f"Scan complete. Found {dicom_dirs_found} leaf directories containing {total_sequences_found} sequences to process.")
 
@@ -149,31 +343,53 @@ def process_root_dir(dicom_root_dir: str,
 
     temp_results_dir = tempfile.mkdtemp(dir=output_root_dir, prefix="dicom_seq_results_")
     print(f"Using temporary directory for sequence results: {temp_results_dir}")
+    scratch_dir = tempfile.mkdtemp(dir=output_root_dir, prefix="dicom_scratch_")
+    if log_debug: print(f"DEBUG: Using scratch directory for staging and conversion: {scratch_dir}")
+    for i, task in enumerate(sequence_tasks):
+        task['scratch_dir'] = os.path.join(scratch_dir, f"task_{i:06d}")
 
-    print(f"Submitting {len(sequence_tasks)} sequence tasks to {num_workers} workers...")
-    with concurrent.futures.ProcessPoolExecutor(max_workers=num_workers) as executor:
-        future_to_seq_name = {
-            executor.submit(process_sequence_and_save,
-                            task['dicom_files'],
-                            task['output_dir'],
-                            task['sequence_name'],
-                            temp_results_dir,
-                            split,
-                            log_debug): task['sequence_name']
-            for task in sequence_tasks
-        }
-
-        for future in tqdm(concurrent.futures.as_completed(future_to_seq_name),
-                           total=len(sequence_tasks),
-                           desc="Processing Sequences"):
-            seq_name = future_to_seq_name[future]
-            try:
-                task_output = future.result()
-                if task_output.get('errors'):
-                    error_list.extend(task_output['errors'])
-            except Exception as e:
-                error_list.append({'SequenceName': seq_name, 'Step': 'Executor', 'Error': str(e)})
-                print(f"ERROR: Executor failed for task processing sequence {seq_name}: {e}")
+    sequence_executor, cpu_executor = _make_executors(executor, num_workers, io_workers,
+                                                      task_timeout, max_tasks_per_worker)
+    if executor == 'hybrid':
+        print(f"Submitting {len(sequence_tasks)} sequence tasks to {io_workers} I/O threads and {num_workers} worker processes...")
+    else:
+        print(f"Submitting {len(sequence_tasks)} sequence tasks to {num_workers} {executor} workers...")
+    try:
+        with sequence_executor, (cpu_executor or contextlib.nullcontext()):
+            future_to_task = {
+                sequence_executor.submit(process_sequence_and_save,
+                                task['dicom_files'],
+                                task['output_dir'],
+                                task['sequence_name'],
+                                temp_results_dir,
+                                split,
+                                log_debug,
+                                preview,
+                                cpu_executor,
+                                task['scratch_dir']): task
+                for task in sequence_tasks
+            }
+
+            for future in tqdm(concurrent.futures.as_completed(future_to_task),
+                               total=len(sequence_tasks),
+                               desc="Processing Sequences"):
+                task = future_to_task[future]
+                seq_name = task['sequence_name']
+                try:
+                    task_output = future.result()
+                    if task_output.get('errors'):
+                        error_list.extend(task_output['errors'])
+                except TaskTimeoutError as e:
+                    shutil.rmtree(task['scratch_dir'], ignore_errors=True)
+                    error_list.append({'SequenceName': seq_name, 'FirstDicomFile': task['dicom_files'][0], 'Step': 'Timeout', 'Error': str(e)})
+                    print(f"ERROR: Timeout processing sequence {seq_name}: {e}")
+                except Exception as e:
+                    shutil.rmtree(task['scratch_dir'], ignore_errors=True)
+                    error_list.append({'SequenceName': seq_name, 'Step': 'Executor', 'Error': str(e)})
+                    print(f"ERROR: Executor failed for task processing sequence {seq_name}: {e}")
+    finally:
+        # Safety net for anything killed workers left behind
+        shutil.rmtree(scratch_dir, ignore_errors=True)
 
     print("Aggregating results...")
     all_temp_files = [os.path.join(temp_results_dir, f)
@@ -214,10 +430,17 @@ def process_root_dir(dicom_root_dir: str,
         print(f"Warning: Could not remove temporary directory {temp_results_dir}: {e}")
 
     if not final_df.empty:
-        parquet_path = os.path.join(output_root_dir, 'nifti_dicom_mapping.parquet')
+        if partition_by:
+            parquet_path = os.path.join(output_root_dir, 'nifti_dicom_mapping')
+        else:
+            parquet_path = os.path.join(output_root_dir, 'nifti_dicom_mapping.parquet')
         try:
-            final_df.to_parquet(parquet_path, engine='pyarrow', index=False)
-            print(f"Final mapping saved to: {parquet_path}")
+            if partition_by:
+                write_mapping_dataset(final_df, parquet_path, partition_by, mode=mapping_mode)
+                print(f"Final mapping saved to dataset ({mapping_mode}, partitioned by {partition_by}): {parquet_path}")
+            else:
+                final_df.to_parquet(parquet_path, engine='pyarrow', index=False)
+                print(f"Final mapping saved to: {parquet_path}")
         except Exception as e:
             print(f"Error saving final Parquet file: {e}")
             error_list.append({'File': parquet_path, 'Step': 'SaveFinalParquet', 'Error': str(e)})
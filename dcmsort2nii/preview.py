@@ -0,0 +1,119 @@
+import os
+import zlib
+import struct
+import numpy as np
+import nibabel as nib
+
+PREVIEW_FORMATS = ('png', 'npy')
+
+def make_midslice_montage(data: np.ndarray) -> np.ndarray:
+    """
+    Build a uint8 montage of the three orthogonal middle slices of a volume.
+
+    Only the three slices are touched, so the volume is never cast to float64.
+    Extra dimensions beyond the third (e.g. an unsplit 4D series) are reduced
+    to their first index.
+
+    Args:
+        data (np.ndarray): 2D, 3D or higher-dimensional image data (or an array proxy)
+
+    Returns:
+        np.ndarray: 2D uint8 array with the slices placed side by side
+    """
+    if data.ndim < 2:
+        raise ValueError(f"Cannot build a preview from data with shape {data.shape}")
+    if data.ndim == 2:
+        slices = [np.asarray(data)]
+    else:
+        index = (slice(None),) * 3 + (0,) * (data.ndim - 3)
+        shape = data.shape[:3]
+        slices = [
+            np.asarray(data[(shape[0] // 2,) + index[1:]]),
+            np.asarray(data[(slice(None), shape[1] // 2) + index[2:]]),
+            np.asarray(data[(slice(None), slice(None), shape[2] // 2) + index[3:]]),
+        ]
+
+    # Window all slices together on the 1st-99th percentile of finite values
+    values = np.concatenate([s.ravel() for s in slices]).astype(np.float32)
+    values = values[np.isfinite(values)]
+    if values.size:
+        low, high = np.percentile(values, [1, 99])
+    else:
+        low, high = 0.0, 0.0
+    scale = 255.0 / (high - low) if high > low else 0.0
+
+    height = max(s.shape[0] for s in slices)
+    tiles = []
+    for s in slices:
+        s = np.nan_to_num(s.astype(np.float32), nan=low, posinf=high, neginf=low)
+        tile = np.zeros((height, s.shape[1]), dtype=np.uint8)
+        tile[:s.shape[0]] = np.clip((s - low) * scale, 0, 255).astype(np.uint8)
+        tiles.append(tile)
+
+    return np.concatenate(tiles, axis=1)
+
+def write_png(image: np.ndarray, png_file: str):
+    """
+    Write a 2D uint8 array as an 8-bit grayscale PNG without extra dependencies.
+
+    Args:
+        image (np.ndarray): 2D uint8 array
+        png_file (str): Output path
+    """
+    image = np.ascontiguousarray(image, dtype=np.uint8)
+    height, width = image.shape
+
+    def chunk(tag: bytes, payload: bytes) -> bytes:
+        return (struct.pack('>I', len(payload)) + tag + payload +
+                struct.pack('>I', zlib.crc32(tag + payload) & 0xffffffff))
+
+    # Each scanline is prefixed with filter type 0 (None)
+    raw = np.hstack([np.zeros((height, 1), dtype=np.uint8), image]).tobytes()
+
+    with open(png_file, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0)))
+        f.write(chunk(b'IDAT', zlib.compress(raw, 6)))
+        f.write(chunk(b'IEND', b''))
+
+def preview_path(nifti_file: str, fmt: str) -> str:
+    """Return the preview path stored next to a NIfTI file."""
+    base_name = os.path.splitext(os.path.splitext(nifti_file)[0])[0]
+    return f"{base_name}_preview.{fmt}"
+
+def save_preview(data: np.ndarray, nifti_file: str, fmt: str = 'png') -> str:
+    """
+    Save an orthogonal mid-slice preview for volume data that is already in memory.
+
+    Args:
+        data (np.ndarray): Image data of the NIfTI file
+        nifti_file (str): Path of the NIfTI file the data belongs to
+        fmt (str): 'png' or 'npy'
+
+    Returns:
+        str: Path to the preview file
+    """
+    if fmt not in PREVIEW_FORMATS:
+        raise ValueError(f"Unsupported preview format '{fmt}', expected one of {PREVIEW_FORMATS}")
+
+    montage = make_midslice_montage(data)
+    output_file = preview_path(nifti_file, fmt)
+    if fmt == 'png':
+        write_png(montage, output_file)
+    else:
+        np.save(output_file, montage)
+    return output_file
+
+def save_preview_from_file(nifti_file: str, fmt: str = 'png') -> str:
+    """
+    Save a preview for a NIfTI file on disk, slicing the array proxy directly.
+
+    Args:
+        nifti_file (str): Path to the NIfTI file
+        fmt (str): 'png' or 'npy'
+
+    Returns:
+        str: Path to the preview file
+    """
+    img = nib.load(nifti_file)
+    return save_preview(img.dataobj, nifti_file, fmt)
@@ -0,0 +1,272 @@
+import os
+import time
+import threading
+import collections
+import multiprocessing
+import concurrent.futures
+from multiprocessing.connection import wait
+from typing import Optional
+from dcmsort2nii.exception import TaskTimeoutError, WorkerCrashedError
+
+_POLL_INTERVAL = 0.05
+_RETIRE_GRACE = 5.0
+
+def _default_context():
+    # Workers are (re)started from the dispatcher thread, so avoid plain fork
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+def _worker_main(conn):
+    """Worker loop: run (fn, args, kwargs) tasks from conn until None or EOF."""
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            break
+        if task is None:
+            break
+
+        fn, args, kwargs = task
+        try:
+            result = (True, fn(*args, **kwargs))
+        except Exception as e:
+            result = (False, e)
+
+        try:
+            conn.send(result)
+        except Exception as e:
+            # Result or exception could not be pickled
+            conn.send((False, RuntimeError(f"Could not return task result ({e!r}): {result[1]!r}")))
+
+class _Worker:
+    """A worker process with a private pipe, running one task at a time."""
+    def __init__(self, ctx):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.tasks_done = 0
+        self.future = None
+        self.started_at = None
+        self.retire_deadline = None
+        self.crashed_future = None
+
+    def retire(self, kill: bool = False):
+        """Ask the worker to exit (or terminate it) without waiting for it."""
+        if kill:
+            self.process.terminate()
+        else:
+            try:
+                self.conn.send(None)
+            except (OSError, ValueError):
+                pass
+        self.retire_deadline = time.monotonic() + _RETIRE_GRACE
+
+    def reap(self) -> bool:
+        """Non-blocking: return True once the retired worker has exited, killing it after the grace period."""
+        if self.process.is_alive():
+            if time.monotonic() > self.retire_deadline:
+                self.process.kill()
+            return False
+        self.process.join()
+        self.conn.close()
+        if self.crashed_future is not None:
+            self.crashed_future.set_exception(self.crash_error())
+        return True
+
+    def crash_error(self) -> WorkerCrashedError:
+        return WorkerCrashedError(f"Worker process exited unexpectedly (exit code {self.process.exitcode})")
+
+    def stop(self, kill: bool = False):
+        self.retire(kill)
+        self.process.join(timeout=_RETIRE_GRACE)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+class RecyclingProcessPool(concurrent.futures.Executor):
+    """
+    Process pool with per-task timeouts and worker recycling.
+
+    Unlike ProcessPoolExecutor, each worker runs one task at a time over its own
+    pipe, so a task that exceeds task_timeout can be killed together with its
+    worker and replaced without affecting other tasks; its future fails with
+    TaskTimeoutError. A worker that dies mid-task fails only that task's future
+    with WorkerCrashedError. After max_tasks_per_worker tasks a worker is retired
+    and replaced, bounding memory growth in long runs.
+
+    Workers are started lazily with the 'forkserver' method (or 'spawn'), so
+    submitted functions and arguments must be picklable and importable.
+
+    Args:
+        max_workers (int, optional): Number of worker processes (default: CPU count)
+        task_timeout (float, optional): Seconds a task may run before its worker is killed
+        max_tasks_per_worker (int, optional): Tasks a worker runs before it is replaced
+        mp_context (optional): multiprocessing context to start workers with
+    """
+    def __init__(self,
+                 max_workers: Optional[int] = None,
+                 task_timeout: Optional[float] = None,
+                 max_tasks_per_worker: Optional[int] = None,
+                 mp_context=None):
+        self._max_workers = max_workers or os.cpu_count() or 1
+        self._task_timeout = task_timeout
+        self._max_tasks_per_worker = max_tasks_per_worker
+        self._ctx = mp_context or _default_context()
+
+        self._workers = []
+        self._retiring = []
+        self._pending = collections.deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._shutdown = False
+
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, daemon=True,
+                                            name="RecyclingProcessPoolDispatcher")
+        self._dispatcher.start()
+
+    def submit(self, fn, *args, **kwargs) -> concurrent.futures.Future:
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            future = concurrent.futures.Future()
+            self._pending.append((future, fn, args, kwargs))
+        self._wakeup.set()
+        return future
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        with self._lock:
+            self._shutdown = True
+            if cancel_futures:
+                while self._pending:
+                    self._pending.popleft()[0].cancel()
+        self._wakeup.set()
+        if wait:
+            self._dispatcher.join()
+
+    def _dispatch_loop(self):
+        try:
+            while True:
+                self._wakeup.clear()
+                self._reap_retired()
+                self._assign_tasks()
+
+                busy = [w for w in self._workers if w.future is not None]
+                if not busy:
+                    with self._lock:
+                        if self._shutdown and not self._pending:
+                            break
+                    # Keep polling while retired workers still need reaping
+                    self._wakeup.wait(timeout=_POLL_INTERVAL if self._retiring else None)
+                    continue
+
+                ready = wait([w.conn for w in busy], timeout=_POLL_INTERVAL)
+                for worker in busy:
+                    if worker.conn in ready:
+                        self._collect(worker)
+                    else:
+                        self._check_worker(worker)
+        except BaseException as e:
+            # Never leave futures hanging if the dispatcher itself fails
+            self._fail_all(e)
+            raise
+        finally:
+            for worker in self._workers:
+                worker.stop(kill=worker.future is not None)
+            for worker in self._retiring:
+                worker.stop(kill=True)
+                if worker.crashed_future is not None:
+                    worker.crashed_future.set_exception(worker.crash_error())
+            self._workers = []
+            self._retiring = []
+
+    def _assign_tasks(self):
+        while True:
+            worker = next((w for w in self._workers if w.future is None), None)
+            if worker is not None and not worker.process.is_alive():
+                # An idle worker died (e.g. OOM killer); replace it before giving it work
+                self._replace(worker, kill=True)
+                continue
+            if worker is None:
+                if len(self._workers) >= self._max_workers:
+                    return
+            with self._lock:
+                if not self._pending:
+                    return
+                item = self._pending.popleft()
+            future, fn, args, kwargs = item
+            # A task requeued after a failed send is already marked running
+            if not future.running() and not future.set_running_or_notify_cancel():
+                continue
+            if worker is None:
+                worker = _Worker(self._ctx)
+                self._workers.append(worker)
+
+            try:
+                worker.conn.send((fn, args, kwargs))
+            except (OSError, ValueError):
+                # Broken pipe: the worker died before the task reached it, so the task never ran
+                self._replace(worker, kill=True)
+                with self._lock:
+                    self._pending.appendleft(item)
+                continue
+            except Exception as e:
+                # Pickling failed before anything was written
+                future.set_exception(e)
+                continue
+            worker.future = future
+            worker.started_at = time.monotonic()
+
+    def _collect(self, worker: _Worker):
+        future = worker.future
+        try:
+            ok, value = worker.conn.recv()
+        except (EOFError, OSError):
+            # The worker is exiting on its own; fail the future once it is reaped
+            # so its exit code can be reported
+            self._replace(worker, kill=False)
+            worker.crashed_future = future
+            return
+
+        worker.future = None
+        worker.tasks_done += 1
+        if self._max_tasks_per_worker and worker.tasks_done >= self._max_tasks_per_worker:
+            self._replace(worker, kill=False)
+
+        if ok:
+            future.set_result(value)
+        else:
+            future.set_exception(value)
+
+    def _check_worker(self, worker: _Worker):
+        elapsed = time.monotonic() - worker.started_at
+        if self._task_timeout is not None and elapsed > self._task_timeout:
+            future = worker.future
+            self._replace(worker, kill=True)
+            future.set_exception(TaskTimeoutError(f"Task exceeded timeout of {self._task_timeout}s; worker was killed and replaced"))
+        elif not worker.process.is_alive():
+            future = worker.future
+            self._replace(worker, kill=True)
+            future.set_exception(worker.crash_error())
+
+    def _replace(self, worker: _Worker, kill: bool):
+        # Replacements are started lazily by _assign_tasks when work is pending.
+        # Retired workers are reaped by later dispatch passes, never waited on here.
+        self._workers.remove(worker)
+        worker.future = None
+        worker.retire(kill=kill)
+        self._retiring.append(worker)
+
+    def _reap_retired(self):
+        self._retiring = [w for w in self._retiring if not w.reap()]
+
+    def _fail_all(self, error: BaseException):
+        futures = [w.future for w in self._workers if w.future is not None]
+        with self._lock:
+            self._shutdown = True
+            futures.extend(item[0] for item in self._pending)
+            self._pending.clear()
+        for future in futures:
+            if not future.done():
+                future.set_exception(WorkerCrashedError(f"Pool dispatcher failed: {error!r}"))
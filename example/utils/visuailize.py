@@ -114,3 +114,47 @@ def visualize_nii_slices(image_paths, columns=5, max_images=20, verbose=True):
 
     plt.tight_layout()
     plt.show()
+
+def read_preview(preview_path):
+    '''
+    preview_path: str, *_preview.png or *_preview.npy file written with --preview
+    '''
+    if preview_path.endswith('.npy'):
+        return np.load(preview_path)
+    return plt.imread(preview_path)
+
+def visualize_previews(preview_paths, columns=5, max_images=20, verbose=True):
+    '''
+    preview_paths: list of str, preview files (e.g. the PreviewFile column of the mapping)
+    columns: int, number of columns in the plot
+    max_images: int, maximum number of images to plot
+    '''
+    preview_paths = [p for p in preview_paths if isinstance(p, str)]
+    if len(preview_paths) == 0:
+        print("No preview paths provided.")
+        return
+    if len(preview_paths) > max_images:
+        preview_paths = preview_paths[:max_images]
+
+    if verbose:
+        for i, preview_path in enumerate(preview_paths):
+            print(f"Image {i+1}: {preview_path}")
+
+    num_images = len(preview_paths)
+    num_rows = (num_images + columns - 1) // columns
+    fig, axes = plt.subplots(num_rows, columns, figsize=(columns * 5, num_rows * 4))
+
+    if not isinstance(axes, np.ndarray):
+        axes = np.array([axes])
+
+    axes_flat = axes.ravel()
+
+    for i, ax in enumerate(axes_flat):
+        if i >= num_images:
+            ax.axis('off')
+            continue
+        ax.imshow(read_preview(preview_paths[i]), cmap='gray')
+        ax.set_title(f'Image {i+1}: Mid-slices')
+
+    plt.tight_layout()
+    plt.show()
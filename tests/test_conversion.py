@@ -0,0 +1,47 @@
+import os
+import time
+import tempfile
+import pytest
+from dcmsort2nii.workers import RecyclingProcessPool
+from dcmsort2nii.exception import TaskTimeoutError
+
+# Runs in a pool worker, so it sets up its own patching
+
+def convert_and_hang(dicom_files, output_dir, scratch_dir, system_temp_dir):
+    import dicom2nifti.convert_dicom
+    from dcmsort2nii.conversion import convert_sequence_to_nifti
+
+    tempfile.tempdir = system_temp_dir
+
+    def hang(*args, **kwargs):
+        time.sleep(600)
+
+    dicom2nifti.convert_dicom.dicom_array_to_nifti = hang
+    return convert_sequence_to_nifti(dicom_files, output_dir, 'hung_series', temp_root=scratch_dir)
+
+def test_killed_conversion_leaves_nothing_outside_scratch(tmp_path):
+    pytest.importorskip('dicom2nifti')
+
+    input_dir = tmp_path / 'input'
+    output_dir = tmp_path / 'output'
+    scratch_dir = tmp_path / 'scratch'
+    system_temp_dir = tmp_path / 'system_tmp'
+    for d in (input_dir, output_dir, scratch_dir, system_temp_dir):
+        d.mkdir()
+
+    dicom_files = []
+    for i in range(3):
+        path = input_dir / f'file_{i}.dcm'
+        path.write_bytes(b'not really dicom')
+        dicom_files.append(str(path))
+
+    with RecyclingProcessPool(1, task_timeout=2.0) as pool:
+        future = pool.submit(convert_and_hang, dicom_files, str(output_dir),
+                             str(scratch_dir), str(system_temp_dir))
+        with pytest.raises(TaskTimeoutError):
+            future.result(timeout=60)
+
+    # The killed worker never cleaned up, but everything it left is under the scratch root
+    assert os.listdir(system_temp_dir) == []
+    assert os.listdir(output_dir) == []
+    assert os.listdir(scratch_dir) != []
@@ -0,0 +1,79 @@
+import pytest
+import pandas as pd
+from dcmsort2nii import mapping
+from dcmsort2nii.mapping import write_mapping_dataset, query_mapping
+
+def make_mapping(rows):
+    return pd.DataFrame([
+        {'NiftiFile': nifti, 'Patient ID': patient, 'Study Date': date, 'Series Instance UID': f'1.2.{nifti}'}
+        for nifti, patient, date in rows
+    ])
+
+def read_all(dataset_dir):
+    df = query_mapping(str(dataset_dir))
+    return df.sort_values('NiftiFile').reset_index(drop=True)
+
+def test_overwrite_replaces_dataset(tmp_path):
+    dataset_dir = tmp_path / 'mapping'
+    write_mapping_dataset(make_mapping([('a.nii.gz', 'P1', '20200101'), ('b.nii.gz', 'P2', '20200102')]), str(dataset_dir))
+    write_mapping_dataset(make_mapping([('c.nii.gz', 'P3', '20210101')]), str(dataset_dir))
+
+    df = read_all(dataset_dir)
+    assert df['NiftiFile'].tolist() == ['c.nii.gz']
+    assert df['Study Date'].tolist() == ['20210101']
+    # Partitions of the old files are removed with them
+    assert sorted(p.name for p in dataset_dir.iterdir()) == ['Study Date=20210101']
+
+def test_append_keeps_existing_rows(tmp_path):
+    dataset_dir = tmp_path / 'mapping'
+    write_mapping_dataset(make_mapping([('a.nii.gz', 'P1', '20200101')]), str(dataset_dir))
+    write_mapping_dataset(make_mapping([('b.nii.gz', 'P2', '20200101'), ('c.nii.gz', 'P3', '20200305')]),
+                          str(dataset_dir), mode='append')
+
+    df = read_all(dataset_dir)
+    assert df['NiftiFile'].tolist() == ['a.nii.gz', 'b.nii.gz', 'c.nii.gz']
+    assert df['Study Date'].tolist() == ['20200101', '20200101', '20200305']
+
+def test_upsert_moves_row_between_partitions(tmp_path):
+    dataset_dir = tmp_path / 'mapping'
+    write_mapping_dataset(make_mapping([('a.nii.gz', 'P1', '20200101'), ('b.nii.gz', 'P2', '20200101')]), str(dataset_dir))
+    write_mapping_dataset(make_mapping([('a.nii.gz', 'P1', '20200202'), ('c.nii.gz', 'P3', '20200303')]),
+                          str(dataset_dir), mode='upsert')
+
+    df = read_all(dataset_dir)
+    assert df['NiftiFile'].tolist() == ['a.nii.gz', 'b.nii.gz', 'c.nii.gz']
+    assert df['Study Date'].tolist() == ['20200202', '20200101', '20200303']
+
+def test_conflicting_append_raises_and_keeps_dataset_readable(tmp_path):
+    dataset_dir = tmp_path / 'mapping'
+    df = make_mapping([('a.nii.gz', 'P1', '20200101')])
+    df['Slice Thickness'] = [1.5]
+    write_mapping_dataset(df, str(dataset_dir))
+
+    conflicting = make_mapping([('b.nii.gz', 'P2', '20200102')])
+    conflicting['Slice Thickness'] = ['thick']
+    with pytest.raises(ValueError, match='Slice Thickness'):
+        write_mapping_dataset(conflicting, str(dataset_dir), mode='append')
+
+    df = read_all(dataset_dir)
+    assert df['NiftiFile'].tolist() == ['a.nii.gz']
+    assert df['Slice Thickness'].tolist() == [1.5]
+
+def test_query_mapping_filters(tmp_path):
+    dataset_dir = tmp_path / 'mapping'
+    write_mapping_dataset(make_mapping([('a.nii.gz', 'P1', '20191231'),
+                                        ('b.nii.gz', 'P2', '20200615'),
+                                        ('c.nii.gz', 'P1', '20201001')]), str(dataset_dir))
+
+    df = query_mapping(str(dataset_dir),
+                       [('Study Date', '>=', '20200101'), ('Patient ID', '==', 'P1')],
+                       columns=['NiftiFile', 'Study Date'])
+    assert df.to_dict('records') == [{'NiftiFile': 'c.nii.gz', 'Study Date': '20201001'}]
+
+def test_query_mapping_filter_list_needs_filters_to_expression(tmp_path, monkeypatch):
+    dataset_dir = tmp_path / 'mapping'
+    write_mapping_dataset(make_mapping([('a.nii.gz', 'P1', '20200101')]), str(dataset_dir))
+    monkeypatch.setattr(mapping, '_filters_to_expression', None)
+
+    with pytest.raises(ImportError, match='newer pyarrow'):
+        query_mapping(str(dataset_dir), [('Patient ID', '==', 'P1')])
@@ -0,0 +1,51 @@
+import zlib
+import struct
+import numpy as np
+import nibabel as nib
+import pytest
+from dcmsort2nii.preview import make_midslice_montage, save_preview, save_preview_from_file
+
+def read_png(png_file):
+    with open(png_file, 'rb') as f:
+        content = f.read()
+    assert content[:8] == b'\x89PNG\r\n\x1a\n'
+
+    chunks = {}
+    pos = 8
+    while pos < len(content):
+        length, tag = struct.unpack('>I4s', content[pos:pos + 8])
+        payload = content[pos + 8:pos + 8 + length]
+        crc, = struct.unpack('>I', content[pos + 8 + length:pos + 12 + length])
+        assert crc == zlib.crc32(tag + payload) & 0xffffffff
+        chunks[tag] = payload
+        pos += 12 + length
+
+    width, height, bit_depth, color_type = struct.unpack('>IIBB', chunks[b'IHDR'][:10])
+    assert (bit_depth, color_type) == (8, 0)
+    rows = np.frombuffer(zlib.decompress(chunks[b'IDAT']), dtype=np.uint8).reshape(height, width + 1)
+    assert not rows[:, 0].any()
+    return rows[:, 1:]
+
+@pytest.mark.parametrize('shape', [(20, 16, 6), (20, 16, 6, 3)])
+def test_montage_shape(shape):
+    data = np.random.default_rng(0).normal(size=shape).astype(np.float32)
+    montage = make_midslice_montage(data)
+
+    # Sagittal (Y, Z), coronal (X, Z) and axial (X, Y) slices side by side
+    assert montage.dtype == np.uint8
+    assert montage.shape == (max(shape[0], shape[1]), shape[2] + shape[2] + shape[1])
+
+@pytest.mark.parametrize('shape', [(20, 16, 6), (20, 16, 6, 3)])
+def test_png_preview_round_trip(tmp_path, shape):
+    data = np.arange(np.prod(shape), dtype=np.int16).reshape(shape)
+    nifti_file = str(tmp_path / 'series.nii.gz')
+    nib.save(nib.Nifti1Image(data, np.eye(4)), nifti_file)
+
+    in_memory = read_png(save_preview(data, nifti_file))
+    from_file = save_preview_from_file(nifti_file)
+    assert from_file == str(tmp_path / 'series_preview.png')
+
+    image = read_png(from_file)
+    assert image.shape == (20, 6 + 6 + 16)
+    np.testing.assert_array_equal(image, make_midslice_montage(data))
+    np.testing.assert_array_equal(image, in_memory)
@@ -0,0 +1,96 @@
+import os
+import time
+import signal
+import threading
+import pytest
+from dcmsort2nii.workers import RecyclingProcessPool
+from dcmsort2nii.exception import TaskTimeoutError, WorkerCrashedError
+
+# Task functions live at module level so forkserver/spawn workers can import them
+
+def sleep_and_getpid(seconds):
+    time.sleep(seconds)
+    return os.getpid()
+
+def exit_worker(code):
+    os._exit(code)
+
+def raise_value_error(message):
+    raise ValueError(message)
+
+def delay_worker_exit(seconds):
+    # A non-daemon thread keeps the worker process alive after it is told to exit
+    threading.Thread(target=time.sleep, args=(seconds,)).start()
+    return os.getpid()
+
+def wait_until_running(future, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not future.running() and not future.done():
+        if time.monotonic() > deadline:
+            raise AssertionError("task was never started")
+        time.sleep(0.01)
+
+def test_timeout_kills_only_the_stuck_task():
+    with RecyclingProcessPool(2, task_timeout=1.0) as pool:
+        stuck = pool.submit(sleep_and_getpid, 60)
+        fast = pool.submit(sleep_and_getpid, 0.1)
+        start = time.monotonic()
+
+        with pytest.raises(TaskTimeoutError):
+            stuck.result(timeout=30)
+        assert time.monotonic() - start < 30
+        assert isinstance(fast.result(timeout=30), int)
+
+        # The killed worker is replaced and the pool keeps working
+        assert isinstance(pool.submit(sleep_and_getpid, 0).result(timeout=30), int)
+
+def test_crashed_worker_fails_only_its_task():
+    with RecyclingProcessPool(1) as pool:
+        crashed = pool.submit(exit_worker, 3)
+        with pytest.raises(WorkerCrashedError, match="exit code 3"):
+            crashed.result(timeout=30)
+        assert isinstance(pool.submit(sleep_and_getpid, 0).result(timeout=30), int)
+
+def test_dead_idle_worker_is_replaced_before_use():
+    with RecyclingProcessPool(1) as pool:
+        pid = pool.submit(sleep_and_getpid, 0).result(timeout=30)
+        os.kill(pid, signal.SIGKILL)
+        time.sleep(0.5)
+
+        # The task goes to a fresh worker instead of failing on the dead one
+        new_pid = pool.submit(sleep_and_getpid, 0).result(timeout=30)
+        assert new_pid != pid
+
+def test_task_exception_is_propagated():
+    with RecyclingProcessPool(1) as pool:
+        with pytest.raises(ValueError, match="bad series"):
+            pool.submit(raise_value_error, "bad series").result(timeout=30)
+
+def test_workers_are_recycled_after_max_tasks():
+    with RecyclingProcessPool(1, max_tasks_per_worker=2) as pool:
+        pids = [pool.submit(sleep_and_getpid, 0).result(timeout=30) for _ in range(6)]
+
+    assert len(set(pids)) == 3
+    assert all(pids.count(pid) == 2 for pid in set(pids))
+
+def test_recycling_does_not_wait_for_retired_workers():
+    with RecyclingProcessPool(1, max_tasks_per_worker=1) as pool:
+        start = time.monotonic()
+        pool.submit(delay_worker_exit, 3).result(timeout=30)
+        pids = [pool.submit(sleep_and_getpid, 0).result(timeout=30) for _ in range(3)]
+        assert time.monotonic() - start < 2.5
+
+    assert len(set(pids)) == 3
+
+def test_shutdown_cancel_futures():
+    pool = RecyclingProcessPool(1)
+    running = pool.submit(sleep_and_getpid, 1)
+    wait_until_running(running)
+    pending = [pool.submit(sleep_and_getpid, 0) for _ in range(3)]
+
+    pool.shutdown(wait=True, cancel_futures=True)
+
+    assert isinstance(running.result(timeout=0), int)
+    assert all(future.cancelled() for future in pending)
+    with pytest.raises(RuntimeError):
+        pool.submit(sleep_and_getpid, 0)